@@ -22,14 +22,23 @@ Author: Generated for SIH25 project
 """
 
 import os
-import sys
 import subprocess
-import json
+import hashlib
 import logging
+import queue
+import select
+import shutil
+import struct
 import tempfile
-import uuid
-from flask import Flask, request, jsonify
-from werkzeug.utils import secure_filename
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+import orjson
+from flask import Flask, Request, request, jsonify, abort
+from flask.json.provider import JSONProvider
+from werkzeug.exceptions import HTTPException
+from speciesnet_runtime import check_image_decoder, configure_accelerators
 
 # Configure logging
 logging.basicConfig(
@@ -37,20 +46,162 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
+# Options shared by every orjson serialization
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson for faster response serialization."""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=ORJSON_OPTIONS).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        # Hand orjson's bytes straight to the response without a str round trip
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, option=ORJSON_OPTIONS),
+            mimetype='application/json'
+        )
+
 # Initialize Flask app
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 # Configuration
-UPLOAD_FOLDER = 'api_uploads'
-app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100MB limit
+# The model downsamples every image, so anything larger than this is a
+# mistake or abuse; oversize requests are rejected before being read
+MAX_UPLOAD_MB = 20
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_MB * 1024 * 1024
+
+# Free space /dev/shm needs before uploads are spooled there: a full-size
+# upload on every thread of the default gunicorn setup (2 workers x 8 threads)
+SHM_MIN_FREE_BYTES = 16 * app.config['MAX_CONTENT_LENGTH']
+
+def default_upload_folder():
+    """
+    Pick tmpfs (/dev/shm) for uploads when it has room, else the temp dir.
+    
+    Docker limits /dev/shm to 64MB by default, which concurrent uploads
+    would exhaust mid-request.
+    """
+    if os.path.isdir('/dev/shm'):
+        free = shutil.disk_usage('/dev/shm').free
+        if free >= SHM_MIN_FREE_BYTES:
+            return '/dev/shm'
+        logging.warning(
+            "/dev/shm has only %dMB free (need %dMB), spooling uploads to %s instead",
+            free // (1024 * 1024), SHM_MIN_FREE_BYTES // (1024 * 1024), tempfile.gettempdir()
+        )
+    return tempfile.gettempdir()
+
+# Uploads only need to live for the duration of a request, so keep them on
+# tmpfs (/dev/shm) where available instead of persistent storage
+UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER') or default_upload_folder()
+
+# Dynamic batching: concurrent requests are coalesced into one model call of
+# up to MAX_BATCH images, waiting at most MAX_LATENCY_MS for a batch to fill
+MAX_BATCH = int(os.environ.get('SPECIESNET_MAX_BATCH', 8))
+MAX_LATENCY_MS = int(os.environ.get('SPECIESNET_MAX_LATENCY_MS', 10))
+
+# Seconds a request waits for its batch to be classified
+INFERENCE_TIMEOUT = 60
+
+# Upper bound in seconds for the backoff between failed warmup attempts
+WARMUP_MAX_RETRY_DELAY = 60
+
+# Number of clean responses kept in the content-addressed prediction cache
+PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 4096))
 
-# Create uploads directory
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
-    logging.info(f"Created uploads directory: {UPLOAD_FOLDER}")
+# Endpoints that accept image uploads
+UPLOAD_ENDPOINTS = frozenset({'classify_image', 'classify_image_raw'})
 
 # Allowed file extensions
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'tiff', 'webp'}
+ALLOWED_EXTENSIONS = frozenset({'png', 'jpg', 'jpeg', 'gif', 'bmp', 'tiff', 'webp'})
+
+# SpeciesNet model to load (Kaggle model handle or local model directory);
+# falls back to the package's DEFAULT_MODEL when unset
+SPECIESNET_MODEL = os.environ.get('SPECIESNET_MODEL')
+
+# Python interpreter of a separate SpeciesNet environment. When set, inference
+# runs in a persistent worker process instead of in this process.
+SPECIESNET_PYTHON = os.environ.get('SPECIESNET_PYTHON')
+
+# Seconds the worker may take to answer one batch, and extra seconds allowed
+# for a freshly started worker to load the model (first boot downloads it)
+WORKER_RESPONSE_TIMEOUT = int(os.environ.get('SPECIESNET_WORKER_TIMEOUT', 120))
+WORKER_STARTUP_TIMEOUT = int(os.environ.get('SPECIESNET_WORKER_STARTUP_TIMEOUT', 900))
+
+# Worker script served over stdin/stdout
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'speciesnet_worker.py')
+
+class HashingFile:
+    """
+    Writable file wrapper that hashes everything written through it.
+    
+    Lets the prediction cache key be computed while the upload is spooled,
+    without reading the file back.
+    """
+    
+    def __init__(self, file):
+        self.file = file
+        self.content_hash = hashlib.blake2b(digest_size=16)
+    
+    def write(self, data):
+        self.content_hash.update(data)
+        return self.file.write(data)
+    
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+class UploadRequest(Request):
+    """
+    Request that spools uploaded files straight into UPLOAD_FOLDER.
+    
+    Werkzeug would otherwise buffer uploads over 500KB in a temporary file
+    in the system temp directory (usually disk-backed /tmp). Each file part
+    is written once, under a generated name, to a file SpeciesNet can read
+    by path and hashed as it is written; teardown deletes them after the
+    request.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.spooled_paths = []
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # Keep the extension only when it is one we accept; the client
+        # filename never becomes part of the path otherwise
+        suffix = os.path.splitext(filename or '')[1].lower()
+        if suffix[1:] not in ALLOWED_EXTENSIONS:
+            suffix = ''
+        
+        tmp = tempfile.NamedTemporaryFile(dir=UPLOAD_FOLDER, suffix=suffix, delete=False)
+        self.spooled_paths.append(tmp.name)
+        return HashingFile(tmp)
+
+app.request_class = UploadRequest
+
+@app.before_request
+def reject_oversize_uploads():
+    """Reject oversize uploads from the Content-Length header before reading any of the body."""
+    if request.endpoint in UPLOAD_ENDPOINTS and request.content_length is not None and \
+            request.content_length > app.config['MAX_CONTENT_LENGTH']:
+        abort(413)
+
+@app.teardown_request
+def remove_spooled_uploads(error):
+    """Delete the files UploadRequest spooled for this request."""
+    for path in request.spooled_paths:
+        try:
+            os.unlink(path)
+            logging.info("Cleaned up temporary file: %s", path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.error("Failed to delete temporary file %s: %s", path, e)
 
 def get_cameratrapai_path():
     """Find the cameratrapai directory relative to this script."""
@@ -67,8 +218,37 @@ def get_cameratrapai_path():
 
 def allowed_file(filename):
     """Check if the file has an allowed extension."""
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    dot = filename.rfind('.')
+    return dot != -1 and filename[dot + 1:].lower() in ALLOWED_EXTENSIONS
+
+# Clean response returned when no animal is detected
+_EMPTY_RESPONSE = {
+    "biologicalClass": None,
+    "order": None,
+    "family": None,
+    "genus": None,
+    "species": None,
+    "commonName": None,
+    "score": 0.0,
+    "bboxX": None,
+    "bboxY": None,
+    "bboxWidth": None,
+    "bboxHeight": None
+}
+
+def _empty():
+    """Return a fresh copy of the empty response."""
+    return _EMPTY_RESPONSE.copy()
+
+def is_cacheable(raw_predictions):
+    """
+    Check whether raw SpeciesNet output is a complete result worth caching.
+    
+    Missing predictions and per-image failures (e.g. a detector error or
+    running out of GPU memory) are transient and must be retried, not cached.
+    """
+    predictions = raw_predictions.get('predictions')
+    return bool(predictions) and not predictions[0].get('failures')
 
 def process_speciesnet_output(raw_predictions):
     """
@@ -79,102 +259,401 @@ def process_speciesnet_output(raw_predictions):
         
     Returns:
         Clean, structured prediction data
+        
+    Raises:
+        Exception: If the raw output is malformed
     """
-    try:
-        # Handle case where no predictions
-        if not raw_predictions.get('predictions') or len(raw_predictions['predictions']) == 0:
-            return {
-                "biologicalClass": None,
-                "order": None,
-                "family": None,
-                "genus": None,
-                "species": None,
-                "commonName": None,
-                "score": 0.0,
-                "bboxX": None,
-                "bboxY": None,
-                "bboxWidth": None,
-                "bboxHeight": None
-            }
+    # Handle case where no predictions
+    if not raw_predictions.get('predictions') or len(raw_predictions['predictions']) == 0:
+        return _empty()
 
-        prediction_data = raw_predictions['predictions'][0]
-        
-        # Check if any animals were detected
-        detections = prediction_data.get('detections', [])
+    prediction_data = raw_predictions['predictions'][0]
+    
+    # Check if any animals were detected
+    detections = prediction_data.get('detections', [])
+    
+    # Find the most confident animal detection (category "1" = animal)
+    # in a single pass
+    top_detection = None
+    top_conf = -1.0
+    for detection in detections:
+        if detection.get('category') == '1':
+            conf = detection.get('conf', 0)
+            if conf > top_conf:
+                top_conf = conf
+                top_detection = detection
+    
+    if top_detection is None:
+        return _empty()
+    
+    # Get top prediction
+    top_prediction = prediction_data.get('prediction', '')
+    prediction_score = prediction_data.get('prediction_score', 0.0)
+    
+    # Parse taxonomic information from prediction string
+    # Format: "uuid;class;order;family;genus;species;common_name"
+    taxonomy_parts = (top_prediction.split(';', 6) + [None] * 7)[:7]
+    _, biological_class, order, family, genus, species, common_name = taxonomy_parts
+    
+    # Extract bounding box
+    bbox = top_detection.get('bbox', [0, 0, 0, 0])
+    bbox_x = bbox[0] if len(bbox) > 0 else 0
+    bbox_y = bbox[1] if len(bbox) > 1 else 0
+    bbox_w = bbox[2] if len(bbox) > 2 else 0
+    bbox_h = bbox[3] if len(bbox) > 3 else 0
+    
+    # Build clean response
+    response = {
+        "biologicalClass": biological_class or None,
+        "order": order or None,
+        "family": family or None,
+        "genus": genus or None,
+        "species": species or None,
+        "commonName": common_name or None,
+        "score": prediction_score,
+        "bboxX": bbox_x,
+        "bboxY": bbox_y,
+        "bboxWidth": bbox_w,
+        "bboxHeight": bbox_h
+    }
+    
+    return response
+
+class SpeciesNetWorkerError(RuntimeError):
+    """Raised when the persistent SpeciesNet worker fails to return predictions."""
+
+class SpeciesNetWorker:
+    """
+    Long-lived child process that keeps SpeciesNet loaded between requests.
+    
+    Requests are written to the worker's stdin and answered on its stdout,
+    one JSON document per line. The worker is respawned if it exits.
+    """
+    
+    def __init__(self, python_executable, model_name=None):
+        # Resolved once; respawns reuse the same argv and working directory
+        self.cmd = [python_executable, WORKER_SCRIPT]
+        if model_name:
+            self.cmd += ['--model', model_name]
+        self.cwd = get_cameratrapai_path()
+        self.process = None
+        self.lock = threading.Lock()
+        self._spawn()
+    
+    def _spawn(self):
+        """Start (or restart) the worker process."""
+        logging.info("Starting SpeciesNet worker: %s", self.cmd)
+        self.process = subprocess.Popen(
+            self.cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            bufsize=0,
+            cwd=self.cwd
+        )
+        # The first response also covers loading the model
+        self.started = False
+    
+    def _respawn(self):
+        """Kill and reap the current worker process, then start a new one."""
+        self.process.kill()
+        self.process.wait()
+        self._spawn()
+    
+    def _read_response(self, timeout):
+        """
+        Read one response line from the worker, waiting at most timeout seconds.
+        
+        Returns:
+            The line, b'' on EOF, or None on timeout
+        """
+        fd = self.process.stdout.fileno()
+        deadline = time.monotonic() + timeout
+        chunks = []
+        
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                continue
+            
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                return b''
+            
+            chunks.append(chunk)
+            if chunk.endswith(b'\n'):
+                return b''.join(chunks)
+    
+    def is_alive(self):
+        """Check whether the worker process is still running."""
+        return self.process is not None and self.process.poll() is None
+    
+    def ensure_running(self):
+        """
+        Respawn the worker if it has exited, without waiting on a request.
+        
+        Returns:
+            Whether the worker process is running afterwards
+        """
+        if self.is_alive():
+            return True
+        
+        # A busy lock means a request is using the worker and predict()
+        # respawns it itself; never block the health check behind it
+        if self.lock.acquire(blocking=False):
+            try:
+                if not self.is_alive():
+                    logging.error("SpeciesNet worker is not running, respawning")
+                    self._respawn()
+            finally:
+                self.lock.release()
         
-        # Filter for animal detections (category "1" = animal)
-        animal_detections = [d for d in detections if d.get('category') == '1']
+        return self.is_alive()
+    
+    def predict(self, filepaths):
+        """
+        Classify images in the worker process.
         
-        if not animal_detections:
-            return {
-                "biologicalClass": None,
-                "order": None,
-                "family": None,
-                "genus": None,
-                "species": None,
-                "commonName": None,
-                "score": 0.0,
-                "bboxX": None,
-                "bboxY": None,
-                "bboxWidth": None,
-                "bboxHeight": None
-            }
+        Args:
+            filepaths: List of absolute image paths
+            
+        Returns:
+            Raw SpeciesNet predictions as JSON
+        """
+        request_line = orjson.dumps({'filepaths': filepaths}) + b'\n'
+        
+        with self.lock:
+            if not self.is_alive():
+                logging.error("SpeciesNet worker is not running, respawning")
+                self._respawn()
+            
+            timeout = WORKER_RESPONSE_TIMEOUT
+            if not self.started:
+                timeout += WORKER_STARTUP_TIMEOUT
+            
+            try:
+                self.process.stdin.write(request_line)
+                self.process.stdin.flush()
+                response_line = self._read_response(timeout)
+            except OSError as e:
+                logging.error("Failed to communicate with SpeciesNet worker: %s", e)
+                response_line = b''
+            
+            if response_line is None:
+                # Hung worker (e.g. a stuck CUDA call): replace it rather
+                # than blocking every later batch behind it
+                logging.error("SpeciesNet worker did not respond within %ss, respawning", timeout)
+                self._respawn()
+                raise SpeciesNetWorkerError(f'SpeciesNet worker did not respond within {timeout}s')
+            
+            if not response_line:
+                # EOF: the worker died while handling this request
+                self._respawn()
+                raise SpeciesNetWorkerError('SpeciesNet worker exited unexpectedly')
+            
+            try:
+                response = orjson.loads(response_line)
+            except orjson.JSONDecodeError:
+                response = None
+            
+            if not isinstance(response, dict) or response_line.count(b'\n') != 1:
+                # A stray line on the pipe means requests and responses are
+                # out of step; only a fresh worker can resynchronise them
+                logging.error("SpeciesNet worker sent an invalid response: %r", response_line[:200])
+                self._respawn()
+                raise SpeciesNetWorkerError('SpeciesNet worker sent an invalid response')
+            
+            self.started = True
         
-        # Get top prediction and detection
-        top_prediction = prediction_data.get('prediction', '')
-        prediction_score = prediction_data.get('prediction_score', 0.0)
-        top_detection = max(animal_detections, key=lambda x: x.get('conf', 0))
-        
-        # Parse taxonomic information from prediction string
-        # Format: "uuid;class;order;family;genus;species;common_name"
-        taxonomy_parts = top_prediction.split(';')
-        
-        biological_class = taxonomy_parts[1] if len(taxonomy_parts) > 1 else None
-        order = taxonomy_parts[2] if len(taxonomy_parts) > 2 else None
-        family = taxonomy_parts[3] if len(taxonomy_parts) > 3 else None
-        genus = taxonomy_parts[4] if len(taxonomy_parts) > 4 else None
-        species = taxonomy_parts[5] if len(taxonomy_parts) > 5 else None
-        common_name = taxonomy_parts[6] if len(taxonomy_parts) > 6 else None
-        
-        # Extract bounding box
-        bbox = top_detection.get('bbox', [0, 0, 0, 0])
-        bbox_x = bbox[0] if len(bbox) > 0 else 0
-        bbox_y = bbox[1] if len(bbox) > 1 else 0
-        bbox_w = bbox[2] if len(bbox) > 2 else 0
-        bbox_h = bbox[3] if len(bbox) > 3 else 0
-        
-        # Build clean response
-        response = {
-            "biologicalClass": biological_class if biological_class else None,
-            "order": order if order else None,
-            "family": family if family else None,
-            "genus": genus if genus else None,
-            "species": species if species else None,
-            "commonName": common_name if common_name else None,
-            "score": prediction_score,
-            "bboxX": bbox_x,
-            "bboxY": bbox_y,
-            "bboxWidth": bbox_w,
-            "bboxHeight": bbox_h
-        }
+        if 'error' in response:
+            raise SpeciesNetWorkerError(response['error'])
         
         return response
+
+def load_speciesnet_model():
+    """
+    Load the SpeciesNet ensemble once for the lifetime of the process.
+    
+    Returns:
+        SpeciesNet model instance ready for inference
+    """
+    from speciesnet import DEFAULT_MODEL, SpeciesNet
+    
+    check_image_decoder()
+    configure_accelerators()
+    
+    model_name = SPECIESNET_MODEL or DEFAULT_MODEL
+    logging.info("Loading SpeciesNet model: %s", model_name)
+    return SpeciesNet(model_name)
+
+# Load the model (or start the worker that holds it) at import time so
+# requests never pay interpreter startup, framework imports or weight loading
+if SPECIESNET_PYTHON:
+    app.config['MODEL'] = None
+    app.config['WORKER'] = SpeciesNetWorker(SPECIESNET_PYTHON, SPECIESNET_MODEL)
+else:
+    app.config['MODEL'] = load_speciesnet_model()
+    app.config['WORKER'] = None
+
+# The underlying TF/PyTorch graphs are not guaranteed to be reentrant
+model_lock = threading.Lock()
+
+def predict_filepaths(filepaths):
+    """
+    Run SpeciesNet on a batch of images with the loaded model or worker.
+    
+    Args:
+        filepaths: List of absolute image paths
         
-    except Exception as e:
-        logging.error(f"Error processing SpeciesNet output: {e}")
-        return {
-            "biologicalClass": None,
-            "order": None,
-            "family": None,
-            "genus": None,
-            "species": None,
-            "commonName": None,
-            "score": 0.0,
-            "bboxX": None,
-            "bboxY": None,
-            "bboxWidth": None,
-            "bboxHeight": None
+    Returns:
+        Raw SpeciesNet predictions as JSON
+    """
+    worker = app.config['WORKER']
+    if worker is not None:
+        predictions = worker.predict(filepaths)
+    else:
+        with model_lock:
+            predictions = app.config['MODEL'].predict(
+                filepaths=filepaths,
+                batch_size=MAX_BATCH,
+                progress_bars=False
+            ) or {}
+    
+    # Any successful model call proves the instance can serve traffic
+    app.config['READY'] = True
+    
+    return predictions
+
+class InferenceTimeoutError(RuntimeError):
+    """Raised when a queued image is not classified within INFERENCE_TIMEOUT."""
+
+class PredictionBatcher:
+    """
+    Coalesce concurrent classification requests into batched model calls.
+    
+    A background thread collects queued image paths until MAX_BATCH images
+    are waiting or MAX_LATENCY_MS has passed, classifies them together and
+    hands each request its own prediction through a Future.
+    """
+    
+    def __init__(self, predict_fn, max_batch, max_latency_ms):
+        self.predict_fn = predict_fn
+        self.max_batch = max_batch
+        self.max_latency = max_latency_ms / 1000.0
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name='speciesnet-batcher', daemon=True)
+        self.thread.start()
+    
+    def submit(self, filepath):
+        """
+        Queue an image for classification.
+        
+        Args:
+            filepath: Absolute image path
+            
+        Returns:
+            Future resolving to raw SpeciesNet predictions for that image
+        """
+        future = Future()
+        self.queue.put((filepath, future))
+        return future
+    
+    def _run(self):
+        """Collect and classify batches for the lifetime of the process."""
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.max_latency
+            
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            self._process(batch)
+    
+    def _process(self, batch):
+        """Classify one batch and scatter the results to the waiting requests."""
+        # Skip requests that gave up while queued; their uploads are gone
+        batch = [
+            (filepath, future) for filepath, future in batch
+            if future.set_running_or_notify_cancel()
+        ]
+        if not batch:
+            return
+        
+        filepaths = [filepath for filepath, _ in batch]
+        
+        try:
+            predictions = self.predict_fn(filepaths)
+        except Exception as e:
+            logging.error("Batch classification of %d images failed: %s", len(batch), e)
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        
+        by_filepath = {
+            prediction.get('filepath'): prediction
+            for prediction in predictions.get('predictions', [])
         }
+        
+        for filepath, future in batch:
+            prediction = by_filepath.get(filepath)
+            future.set_result({'predictions': [prediction] if prediction else []})
+
+app.config['BATCHER'] = PredictionBatcher(predict_filepaths, MAX_BATCH, MAX_LATENCY_MS)
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache of clean responses keyed by image content hash.
+    
+    Identical images (e.g. client retries) are answered without running
+    the model again.
+    """
+    
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key):
+        """Return the cached response for key, or None on a miss."""
+        with self.lock:
+            response = self.entries.get(key)
+            if response is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return response
+    
+    def put(self, key, response):
+        """Store a response, evicting the least recently used entry if full."""
+        with self.lock:
+            self.entries[key] = response
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+    
+    def stats(self):
+        """Return cache size and hit/miss counters."""
+        with self.lock:
+            return {
+                'size': len(self.entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+app.config['CACHE'] = PredictionCache(PREDICTION_CACHE_SIZE)
 
 def run_speciesnet_classification(image_path):
     """
@@ -186,50 +665,64 @@ def run_speciesnet_classification(image_path):
     Returns:
         Raw SpeciesNet predictions as JSON
     """
-    # Create temporary output file
-    temp_output_path = os.path.join(tempfile.gettempdir(), f'speciesnet_output_{uuid.uuid4().hex}.json')
+    future = app.config['BATCHER'].submit(os.path.abspath(image_path))
     
     try:
-        # Get cameratrapai directory
-        cameratrapai_dir = get_cameratrapai_path()
-        
-        # Prepare command for SpeciesNet inference
-        absolute_image_path = os.path.abspath(image_path)
-        cmd = [
-            sys.executable, '-m', 'speciesnet.scripts.run_model',  # Use current Python interpreter
-            '--filepaths', absolute_image_path,
-            '--predictions_json', temp_output_path,
-            '--noprogress_bars',
-            '--bypass_prompts'
-        ]
-        
-        logging.info(f"Executing SpeciesNet command: {' '.join(cmd)}")
-        logging.info(f"Working directory: {cameratrapai_dir}")
-        
-        # Execute the SpeciesNet model
-        result = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            check=True,
-            cwd=cameratrapai_dir
+        return future.result(timeout=INFERENCE_TIMEOUT)
+    except FutureTimeoutError:
+        # Drop the entry if it is still queued: the upload is deleted when
+        # this request ends, so a later batch could not read it anyway
+        future.cancel()
+        raise InferenceTimeoutError(
+            f'Classification did not finish within {INFERENCE_TIMEOUT} seconds'
         )
+
+def blank_bmp(size=32):
+    """Build a black size x size 24-bit BMP image (size must be a multiple of 4)."""
+    pixels = b'\x00' * (size * size * 3)
+    file_header = struct.pack('<2sIHHI', b'BM', 54 + len(pixels), 0, 0, 54)
+    info_header = struct.pack('<IiiHHIIiiII', 40, size, size, 1, 24, 0, len(pixels), 2835, 2835, 0, 0)
+    return file_header + info_header + pixels
+
+def warm_up_model():
+    """
+    Run one synthetic prediction so weights are resident and kernels are
+    compiled before the first real request, then mark the API as ready.
+    
+    Failed attempts (e.g. a worker still starting, a transient CUDA error)
+    are retried with exponential backoff until the model answers.
+    """
+    delay = 1
+    
+    while not app.config['READY']:
+        warmup_path = None
         
-        # Read the predictions from the output file
-        with open(temp_output_path, 'r') as f:
-            predictions = json.load(f)
+        try:
+            with tempfile.NamedTemporaryFile(dir=UPLOAD_FOLDER, suffix='.bmp', delete=False) as tmp:
+                warmup_path = tmp.name
+                tmp.write(blank_bmp())
             
-        return predictions
-        
-    finally:
-        # Clean up temporary output file
-        if os.path.exists(temp_output_path):
-            try:
-                os.remove(temp_output_path)
-                logging.info(f"Cleaned up temporary output file: {temp_output_path}")
-            except OSError as e:
-                logging.error(f"Failed to delete temporary output file {temp_output_path}: {e}")
+            started = time.monotonic()
+            predict_filepaths([os.path.abspath(warmup_path)])
+            logging.info("SpeciesNet warmup finished in %.1fs", time.monotonic() - started)
+            return
+            
+        except Exception as e:
+            logging.exception("SpeciesNet warmup failed, retrying in %ss: %s", delay, e)
+            
+        finally:
+            if warmup_path:
+                try:
+                    os.unlink(warmup_path)
+                except OSError:
+                    pass
+        
+        time.sleep(delay)
+        delay = min(delay * 2, WARMUP_MAX_RETRY_DELAY)
+
+# Warm up in the background; /health reports 503 until a prediction succeeds
+app.config['READY'] = False
+threading.Thread(target=warm_up_model, name='speciesnet-warmup', daemon=True).start()
 
 @app.route('/api/predict', methods=['POST'])
 def classify_image():
@@ -244,8 +737,6 @@ def classify_image():
         - Clean JSON response with taxonomic classification and bounding box
         - Error responses for various failure conditions
     """
-    temp_file_path = None
-    
     try:
         # Validate request has file part
         if 'image' not in request.files:
@@ -271,56 +762,62 @@ def classify_image():
                 'filename': file.filename
             }), 400
         
-        # Secure filename and save temporarily
-        filename = secure_filename(file.filename)
-        temp_file_path = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(temp_file_path)
+        # The upload was spooled into UPLOAD_FOLDER by UploadRequest, which
+        # hashed its content on the way for the prediction cache
+        file.stream.flush()
+        temp_file_path = file.stream.name
         
-        logging.info(f"Saved uploaded file: {temp_file_path}")
+        # Answer repeated images from the cache
+        cache_key = file.stream.content_hash.digest()
+        cached_response = app.config['CACHE'].get(cache_key)
+        if cached_response is not None:
+            logging.info("Returning cached classification for %s", file.filename)
+            return jsonify(cached_response)
         
         # Run SpeciesNet classification
         raw_predictions = run_speciesnet_classification(temp_file_path)
         
-        # Process into clean format
-        clean_response = process_speciesnet_output(raw_predictions)
-        
-        logging.info(f"Successfully processed classification for {filename}")
+        # Process into clean format; only complete results are cached so
+        # retries of failed classifications run the model again
+        try:
+            clean_response = process_speciesnet_output(raw_predictions)
+        except Exception as e:
+            logging.error("Error processing SpeciesNet output: %s", e)
+            clean_response = _empty()
+        else:
+            if is_cacheable(raw_predictions):
+                app.config['CACHE'].put(cache_key, clean_response)
+        
+        logging.info("Successfully processed classification for %s", file.filename)
         return jsonify(clean_response)
             
-    except FileNotFoundError as e:
-        logging.error(f"SpeciesNet installation not found: {e}")
+    except HTTPException:
+        # e.g. 413 from a chunked upload that exceeded MAX_CONTENT_LENGTH
+        # while being parsed; let the registered error handlers answer
+        raise
+        
+    except InferenceTimeoutError as e:
+        logging.error("Classification timed out for %s: %s", file.filename, e)
         return jsonify({
-            'error': 'SpeciesNet not found',
-            'message': 'The SpeciesNet installation directory could not be located',
-            'details': str(e)
-        }), 500
-            
-    except subprocess.CalledProcessError as e:
-        logging.error(f"SpeciesNet script failed with return code {e.returncode}")
-        logging.error(f"stderr: {e.stderr}")
+            'error': 'Classification timed out',
+            'message': str(e)
+        }), 504
+        
+    except SpeciesNetWorkerError as e:
+        logging.error("SpeciesNet worker failed: %s", e)
         return jsonify({
             'error': 'Model execution failed',
-            'message': 'The SpeciesNet model script encountered an error',
-            'return_code': e.returncode,
-            'stderr': e.stderr
+            'message': 'The SpeciesNet worker process encountered an error',
+            'details': str(e)
         }), 500
         
     except Exception as e:
-        logging.exception(f"Unexpected error during image classification: {e}")
+        logging.exception("Unexpected error during image classification: %s", e)
         return jsonify({
             'error': 'Internal server error',
             'message': 'An unexpected error occurred during processing',
             'details': str(e)
         }), 500
-        
-    finally:
-        # Clean up temporary file
-        if temp_file_path and os.path.exists(temp_file_path):
-            try:
-                os.remove(temp_file_path)
-                logging.info(f"Cleaned up temporary file: {temp_file_path}")
-            except OSError as e:
-                logging.error(f"Failed to delete temporary file {temp_file_path}: {e}")
 
 @app.route('/classify/raw', methods=['POST'])
 def classify_image_raw():
@@ -334,8 +831,6 @@ def classify_image_raw():
     Returns:
         - Raw JSON response from SpeciesNet
     """
-    temp_file_path = None
-    
     try:
         # Same validation as main classify endpoint
         if 'image' not in request.files:
@@ -349,28 +844,25 @@ def classify_image_raw():
         if not allowed_file(file.filename):
             return jsonify({'error': 'Invalid file type'}), 400
         
-        # Save file temporarily
-        filename = secure_filename(file.filename)
-        temp_file_path = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(temp_file_path)
+        # The upload was spooled into UPLOAD_FOLDER by UploadRequest
+        file.stream.flush()
+        temp_file_path = file.stream.name
         
         # Run SpeciesNet classification
         raw_predictions = run_speciesnet_classification(temp_file_path)
         
         return jsonify(raw_predictions)
         
+    except HTTPException:
+        raise
+        
+    except InferenceTimeoutError as e:
+        logging.error("Raw classification timed out: %s", e)
+        return jsonify({'error': str(e)}), 504
+        
     except Exception as e:
-        logging.exception(f"Error in raw classification: {e}")
+        logging.exception("Error in raw classification: %s", e)
         return jsonify({'error': str(e)}), 500
-        
-    finally:
-        if temp_file_path and os.path.exists(temp_file_path):
-            try:
-                os.remove(temp_file_path)
-            except OSError:
-                pass
-
-# ... keep all your existing route handlers (api_info, health_check, error handlers) ...
 
 @app.route('/', methods=['GET'])
 def api_info():
@@ -413,11 +905,30 @@ def api_info():
 @app.route('/health', methods=['GET'])
 def health_check():
     """Simple health check endpoint."""
+    if not app.config['READY']:
+        return jsonify({
+            'status': 'starting',
+            'service': 'SpeciesNet Image Classification API',
+            'message': 'SpeciesNet model is still warming up'
+        }), 503
+    
+    # Respawn a dead worker here too: a load balancer that drains instances
+    # on 503 would otherwise never send the request that restarts it
+    worker = app.config['WORKER']
+    if worker is not None and not worker.ensure_running():
+        return jsonify({
+            'status': 'unhealthy',
+            'service': 'SpeciesNet Image Classification API',
+            'message': 'SpeciesNet worker process is not running'
+        }), 503
+    
     return jsonify({
         'status': 'healthy',
         'service': 'SpeciesNet Image Classification API',
+        'backend': 'worker' if worker is not None else 'in_process',
         'upload_folder': UPLOAD_FOLDER,
-        'allowed_extensions': list(ALLOWED_EXTENSIONS)
+        'allowed_extensions': list(ALLOWED_EXTENSIONS),
+        'prediction_cache': app.config['CACHE'].stats()
     })
 
 @app.errorhandler(413)
@@ -425,7 +936,7 @@ def request_entity_too_large(error):
     """Handle file too large errors."""
     return jsonify({
         'error': 'File too large',
-        'message': 'The uploaded file exceeds the maximum allowed size (100MB)'
+        'message': f'The uploaded file exceeds the maximum allowed size ({MAX_UPLOAD_MB}MB)'
     }), 413
 
 @app.errorhandler(404)
@@ -447,11 +958,16 @@ def method_not_allowed(error):
 
 if __name__ == '__main__':
     logging.info("Starting SpeciesNet Image Classification API v2.0")
-    logging.info(f"Upload folder: {os.path.abspath(UPLOAD_FOLDER)}")
-    logging.info(f"Allowed file extensions: {ALLOWED_EXTENSIONS}")
+    logging.info("Upload folder: %s", os.path.abspath(UPLOAD_FOLDER))
+    logging.info("Allowed file extensions: %s", ALLOWED_EXTENSIONS)
     
+    # Development server only; use gunicorn (gunicorn_conf.py) in production.
+    # The reloader is always off: it polls every source file and would load
+    # the model a second time in its child process.
     app.run(
         host='0.0.0.0',
-        debug=True,
-        port=5000
+        debug=os.environ.get('FLASK_DEBUG') == '1',
+        port=5000,
+        threaded=True,
+        use_reloader=False
     )
\ No newline at end of file
@@ -0,0 +1,31 @@
+"""
+Gunicorn configuration for the SpeciesNet Image Classification API
+
+Runs the API under threaded workers so uploads, JSON encoding and health
+checks on one request overlap with model inference on another.
+
+Usage:
+gunicorn -c gunicorn_conf.py app:app
+"""
+
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+
+# Threaded workers: the model call spends its time in native TF/PyTorch code
+# that releases the GIL, so other threads keep serving I/O meanwhile
+worker_class = 'gthread'
+workers = int(os.environ.get('GUNICORN_WORKERS', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+# Each worker imports app.py, and so loads the model, before gunicorn's
+# heartbeat starts; the arbiter kills workers silent for longer than this.
+# On first boot SpeciesNet downloads its weights from Kaggle, which can take
+# minutes, so the default is generous. Pre-download the weights (see the
+# README) to keep first boots short.
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 600))
+
+# Each worker imports app.py after forking and loads its own model. CUDA
+# contexts and the SpeciesNet worker pipes do not survive fork(), so the
+# model is not preloaded in the master.
+preload_app = False
@@ -0,0 +1,48 @@
+"""
+Runtime setup shared by app.py and speciesnet_worker.py
+
+Prepares the ML frameworks before the SpeciesNet model is loaded, in
+whichever process ends up holding it. Imports neither Flask nor the model.
+
+Author: Generated for SIH25 project
+"""
+
+import logging
+
+def check_image_decoder():
+    """
+    Warn if Pillow's JPEG decoder is not libjpeg-turbo.
+    
+    SpeciesNet decodes every image with Pillow. Stock Pillow wheels bundle
+    libjpeg-turbo; source builds against the plain system libjpeg decode
+    large camera trap JPEGs noticeably slower.
+    """
+    from PIL import features
+    
+    if not features.check_feature('libjpeg_turbo'):
+        logging.warning("Pillow is not built with libjpeg-turbo; JPEG decoding will be slow")
+
+def configure_accelerators():
+    """
+    Prepare TensorFlow and PyTorch GPU state before the model is loaded.
+    
+    SpeciesNet 4.x runs a TensorFlow classifier next to the PyTorch
+    detector, so TensorFlow must not reserve all GPU memory up front.
+    SpeciesNet 5.x is PyTorch-only and does not install TensorFlow. The
+    CUDA context is created once here and stays resident for every request.
+    """
+    import torch
+    
+    try:
+        import tensorflow as tf
+    except ImportError:
+        pass
+    else:
+        for gpu in tf.config.list_physical_devices('GPU'):
+            tf.config.experimental.set_memory_growth(gpu, True)
+    
+    if torch.cuda.is_available():
+        torch.cuda.init()
+        logging.info("Using CUDA device: %s", torch.cuda.get_device_name())
+    else:
+        logging.info("CUDA is not available, running SpeciesNet on CPU")
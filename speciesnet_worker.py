@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Persistent SpeciesNet worker process
+
+Loads the SpeciesNet ensemble once and then serves inference requests over
+stdin/stdout, one JSON document per line. It is started by app.py when the
+API runs in a different Python environment from SpeciesNet (see
+SPECIESNET_PYTHON), so the model is loaded once instead of per request.
+
+Protocol:
+- Request line: {"filepaths": ["/abs/path/image.jpg", ...]}
+- Response line: raw SpeciesNet predictions, or {"error": "..."} on failure
+
+Author: Generated for SIH25 project
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+from speciesnet import DEFAULT_MODEL, SpeciesNet
+from speciesnet_runtime import check_image_decoder, configure_accelerators
+
+# Log to stderr; stdout is reserved for the response protocol
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    stream=sys.stderr
+)
+
+def main():
+    parser = argparse.ArgumentParser(description='Persistent SpeciesNet worker')
+    parser.add_argument('--model', default=DEFAULT_MODEL, help='SpeciesNet model to load')
+    args = parser.parse_args()
+
+    # Keep stray output from the model libraries out of the response stream.
+    # Native TF/PyTorch/CUDA code writes to fd 1 directly, so responses go to
+    # a private duplicate of the original stdout and fd 1 is pointed at stderr.
+    responses = os.fdopen(os.dup(1), 'w')
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+
+    check_image_decoder()
+    configure_accelerators()
+
+    logging.info("Worker loading SpeciesNet model: %s", args.model)
+    model = SpeciesNet(args.model)
+    logging.info("Worker ready")
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+
+        try:
+            request = json.loads(line)
+            predictions = model.predict(
+                filepaths=request['filepaths'],
+                progress_bars=False
+            )
+            response = predictions or {}
+        except Exception as e:
+            logging.exception("Worker failed to classify request: %s", e)
+            response = {'error': str(e)}
+
+        responses.write(json.dumps(response) + '\n')
+        responses.flush()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+"""
+Tests for the SpeciesNet Flask API
+
+SpeciesNet, TensorFlow and PyTorch are stubbed in sys.modules before app
+is imported, so these run without the model or a GPU:
+
+    python -m pytest -q tests
+
+Author: Generated for SIH25 project
+"""
+
+import io
+import os
+import sys
+import tempfile
+import threading
+import types
+
+import pytest
+
+UPLOAD_DIR = tempfile.mkdtemp(prefix='speciesnet-test-')
+os.environ['UPLOAD_FOLDER'] = UPLOAD_DIR
+os.environ.pop('SPECIESNET_PYTHON', None)
+
+PREDICTION = 'uuid;mammalia;carnivora;felidae;panthera;leo;lion'
+
+class FakeSpeciesNet:
+    """Stand-in model that classifies every image as a lion."""
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+    def predict(self, filepaths, batch_size=None, progress_bars=True):
+        return {
+            'predictions': [
+                {
+                    'filepath': filepath,
+                    'prediction': PREDICTION,
+                    'prediction_score': 0.9,
+                    'detections': [{'category': '1', 'conf': 0.8, 'bbox': [0.1, 0.2, 0.3, 0.4]}]
+                }
+                for filepath in filepaths
+            ]
+        }
+
+def stub_module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+    return module
+
+stub_module('speciesnet', DEFAULT_MODEL='test-model', SpeciesNet=FakeSpeciesNet)
+stub_module('tensorflow', config=types.SimpleNamespace(
+    list_physical_devices=lambda device_type: [],
+    experimental=types.SimpleNamespace(set_memory_growth=lambda gpu, enable: None)
+))
+stub_module('torch', cuda=types.SimpleNamespace(is_available=lambda: False))
+
+try:
+    from PIL import features  # noqa: F401
+except ImportError:
+    pil = stub_module('PIL')
+    pil.features = stub_module('PIL.features', check_feature=lambda feature: True)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+from app import (  # noqa: E402
+    PredictionBatcher,
+    PredictionCache,
+    allowed_file,
+    is_cacheable,
+    process_speciesnet_output,
+)
+
+@pytest.fixture
+def client():
+    app.app.config['CACHE'] = PredictionCache(16)
+    return app.app.test_client()
+
+def upload(client, data=b'image bytes', filename='cat.jpg', path='/api/predict'):
+    return client.post(
+        path,
+        data={'image': (io.BytesIO(data), filename)},
+        content_type='multipart/form-data'
+    )
+
+def test_process_speciesnet_output_is_importable():
+    assert callable(process_speciesnet_output)
+
+def test_process_speciesnet_output_without_predictions():
+    assert process_speciesnet_output({}) == app._empty()
+    assert process_speciesnet_output({'predictions': []}) == app._empty()
+
+def test_process_speciesnet_output_without_animal_detection():
+    raw = {'predictions': [{
+        'prediction': PREDICTION,
+        'detections': [{'category': '2', 'conf': 0.9, 'bbox': [0, 0, 1, 1]}]
+    }]}
+    assert process_speciesnet_output(raw) == app._empty()
+
+def test_process_speciesnet_output_picks_most_confident_animal():
+    raw = {'predictions': [{
+        'prediction': PREDICTION,
+        'prediction_score': 0.75,
+        'detections': [
+            {'category': '1', 'conf': 0.3, 'bbox': [0.0, 0.0, 0.1, 0.1]},
+            {'category': '1', 'conf': 0.9, 'bbox': [0.1, 0.2, 0.3, 0.4]},
+            {'category': '2', 'conf': 0.99, 'bbox': [0.5, 0.5, 0.5, 0.5]}
+        ]
+    }]}
+    response = process_speciesnet_output(raw)
+
+    assert response['species'] == 'leo'
+    assert response['commonName'] == 'lion'
+    assert response['score'] == 0.75
+    assert (response['bboxX'], response['bboxY'], response['bboxWidth'], response['bboxHeight']) == \
+        (0.1, 0.2, 0.3, 0.4)
+
+def test_process_speciesnet_output_empty_taxonomy_fields_are_none():
+    raw = {'predictions': [{
+        'prediction': 'uuid;aves;;;;;bird',
+        'detections': [{'category': '1', 'conf': 0.5, 'bbox': [0, 0, 1, 1]}]
+    }]}
+    response = process_speciesnet_output(raw)
+
+    assert response['biologicalClass'] == 'aves'
+    assert response['order'] is None
+    assert response['species'] is None
+    assert response['commonName'] == 'bird'
+
+def test_process_speciesnet_output_short_prediction_and_bbox():
+    raw = {'predictions': [{
+        'prediction': 'uuid;mammalia',
+        'detections': [{'category': '1', 'conf': 0.5, 'bbox': [0.2]}]
+    }]}
+    response = process_speciesnet_output(raw)
+
+    assert response['biologicalClass'] == 'mammalia'
+    assert response['commonName'] is None
+    assert response['bboxX'] == 0.2
+    assert response['bboxHeight'] == 0
+
+def test_is_cacheable():
+    assert is_cacheable({'predictions': [{'prediction': PREDICTION}]})
+    assert not is_cacheable({'predictions': []})
+    assert not is_cacheable({'predictions': [{'failures': ['DETECTOR']}]})
+
+@pytest.mark.parametrize('filename, allowed', [
+    ('cat.jpg', True),
+    ('cat.JPEG', True),
+    ('archive.tar.png', True),
+    ('cat.txt', False),
+    ('jpg', False),
+    ('cat.', False),
+    ('', False),
+])
+def test_allowed_file(filename, allowed):
+    assert allowed_file(filename) is allowed
+
+def test_prediction_cache_evicts_least_recently_used():
+    cache = PredictionCache(2)
+    cache.put(b'a', {'species': 'a'})
+    cache.put(b'b', {'species': 'b'})
+
+    # Touch 'a' so 'b' becomes the eviction candidate
+    assert cache.get(b'a') == {'species': 'a'}
+    cache.put(b'c', {'species': 'c'})
+
+    assert cache.get(b'b') is None
+    assert cache.get(b'a') == {'species': 'a'}
+    assert cache.get(b'c') == {'species': 'c'}
+    assert cache.stats() == {'size': 2, 'maxsize': 2, 'hits': 3, 'misses': 1}
+
+def test_batcher_scatters_predictions_by_filepath():
+    release = threading.Event()
+    calls = []
+
+    def predict(filepaths):
+        release.wait(5)
+        calls.append(filepaths)
+        # Answer out of order and without a prediction for /b.jpg
+        return {'predictions': [
+            {'filepath': '/c.jpg', 'prediction': 'c'},
+            {'filepath': '/a.jpg', 'prediction': 'a'}
+        ]}
+
+    batcher = PredictionBatcher(predict, max_batch=3, max_latency_ms=1000)
+    futures = {path: batcher.submit(path) for path in ('/a.jpg', '/b.jpg', '/c.jpg')}
+    release.set()
+
+    assert futures['/a.jpg'].result(5) == {'predictions': [{'filepath': '/a.jpg', 'prediction': 'a'}]}
+    assert futures['/b.jpg'].result(5) == {'predictions': []}
+    assert futures['/c.jpg'].result(5) == {'predictions': [{'filepath': '/c.jpg', 'prediction': 'c'}]}
+    assert calls == [['/a.jpg', '/b.jpg', '/c.jpg']]
+
+def test_batcher_propagates_model_errors():
+    def predict(filepaths):
+        raise RuntimeError('CUDA out of memory')
+
+    batcher = PredictionBatcher(predict, max_batch=1, max_latency_ms=1)
+
+    with pytest.raises(RuntimeError, match='CUDA out of memory'):
+        batcher.submit('/a.jpg').result(5)
+
+def test_batcher_skips_cancelled_requests():
+    calls = []
+    batcher = PredictionBatcher(lambda filepaths: calls.append(filepaths) or {}, max_batch=2, max_latency_ms=1)
+
+    cancelled = types.SimpleNamespace(set_running_or_notify_cancel=lambda: False)
+    batcher._process([('/gone.jpg', cancelled)])
+
+    assert calls == []
+
+def test_predict_classifies_upload_and_removes_it(client):
+    response = upload(client)
+
+    assert response.status_code == 200
+    assert response.get_json()['commonName'] == 'lion'
+    assert os.listdir(UPLOAD_DIR) == []
+
+def test_predict_answers_repeated_image_from_cache(client):
+    upload(client, b'same image')
+    upload(client, b'same image')
+
+    stats = app.app.config['CACHE'].stats()
+    assert (stats['hits'], stats['size']) == (1, 1)
+
+def test_rejected_upload_is_removed(client):
+    response = upload(client, filename='notes.txt')
+
+    assert response.status_code == 400
+    assert os.listdir(UPLOAD_DIR) == []
+
+def test_raw_endpoint_removes_upload(client):
+    response = upload(client, path='/classify/raw')
+
+    assert response.status_code == 200
+    assert os.listdir(UPLOAD_DIR) == []
+
+def test_oversize_upload_is_rejected_with_413(client):
+    data = b'\x00' * (app.app.config['MAX_CONTENT_LENGTH'] + 1)
+    response = upload(client, data)
+
+    assert response.status_code == 413
+    assert response.get_json()['error'] == 'File too large'
+    assert os.listdir(UPLOAD_DIR) == []